@@ -1,177 +1,355 @@
+import numpy as np
 import pandas as pd
-from collections import defaultdict
+from pandas.api.extensions import take
+import hashlib
 import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
 from flask import Flask, request, send_file, jsonify
+from numba import njit
 import os
+import stat
+import tempfile
+import threading
+import time
 
 app = Flask(__name__)
 
-def safe_read_excel_from_bytes(file_bytes, **kwargs):
+# Excel parsing and matching are CPU-bound, so run them outside the request thread.
+# Every server process (e.g. each gunicorn worker) gets its own pool, so keep it small
+POOL_WORKERS = int(os.environ.get("NBO_POOL_WORKERS", min(2, os.cpu_count() or 1)))
+PROCESSING_TIMEOUT_SECONDS = int(os.environ.get("NBO_PROCESSING_TIMEOUT", 300))
+_executor = None
+_executor_lock = threading.Lock()
+
+# Parsed bank reports, keyed by a hash of the upload; bump the version whenever
+# the cleaning in load_bank_report changes so stale entries are not reused
+BANK_CACHE_DIR = os.path.join(tempfile.gettempdir(), "nbo_bank_cache")
+BANK_CACHE_VERSION = 1
+# Least recently used entries beyond this count are deleted after each write
+BANK_CACHE_MAX_ENTRIES = int(os.environ.get("NBO_BANK_CACHE_ENTRIES", 32))
+# Temp files older than this were abandoned by an interrupted write
+BANK_CACHE_TMP_MAX_AGE_SECONDS = 3600
+
+def get_executor():
+    """Returns this process's worker pool, creating it on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn rather than fork: the server process may already be running threads
+            _executor = ProcessPoolExecutor(
+                max_workers=POOL_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _executor
+
+def discard_executor(executor):
+    """Drops a broken worker pool so the next request starts a fresh one."""
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+def safe_read_excel_from_bytes(file_bytes, engine="calamine", **kwargs):
     """Reads an Excel file from bytes, handling potential errors."""
     try:
-        return pd.read_excel(io.BytesIO(file_bytes), **kwargs)
+        return pd.read_excel(io.BytesIO(file_bytes), engine=engine, **kwargs)
     except Exception as e:
         print(f"❌ Error reading Excel from bytes: {e}")
         raise ValueError(f"Failed to read Excel file: {e}")
 
+@njit(cache=True)
+def _match_receipts(nbo_credits, group_start, group_end, bank_order, bank_amts, bank_oracle_codes, n_oracles):
+    """Greedily allocates receipts to NBO rows, returns matched (NBO, bank) position pairs."""
+    # An oracle number listed under several descriptions can only be matched once
+    oracle_used = np.zeros(n_oracles, dtype=np.bool_)
+    # Receipts in a description group are visited strictly in order and a
+    # skipped receipt's oracle number stays used, so the taken or skipped ones
+    # always form a prefix; track where each group's remaining receipts start
+    group_next = np.arange(len(bank_order))
+    out_nbo = np.empty(len(bank_amts), dtype=np.int64)
+    out_bank = np.empty(len(bank_amts), dtype=np.int64)
+    n_out = 0
+
+    for i in range(len(nbo_credits)):
+        start = group_start[i]
+        end = group_end[i]
+        if start == end:
+            continue
+
+        k = group_next[start]
+        cumulative_sum = 0.0
+        while k < end:
+            bank_idx = bank_order[k]
+            k += 1
+            if oracle_used[bank_oracle_codes[bank_idx]]:
+                continue
+            oracle_used[bank_oracle_codes[bank_idx]] = True
+            out_nbo[n_out] = i
+            out_bank[n_out] = bank_idx
+            n_out += 1
+            cumulative_sum += bank_amts[bank_idx]
+
+            if cumulative_sum >= nbo_credits[i] - 0.01:
+                break
+        group_next[start] = k
+
+    return out_nbo[:n_out], out_bank[:n_out]
+
+def _constant_column(value, n):
+    """Returns a length-n categorical column holding a single value."""
+    return pd.Categorical.from_codes(np.zeros(n, dtype=np.int8), categories=[value])
+
+def _max_text_length(series):
+    """Returns the longest rendered text length in a column, 0 when it is empty or all missing."""
+    lengths = series.astype("string").str.len().fillna(0).to_numpy(dtype=np.int64)
+    return lengths.max(initial=0)
+
+def _bank_cache_dir_is_private():
+    """Creates the bank report cache directory if needed, returns whether only this user can write to it."""
+    # Cache entries are pickles, which can run code when loaded, so never trust
+    # a directory in the shared temp dir that someone else created or can write to
+    try:
+        os.makedirs(BANK_CACHE_DIR, mode=0o700, exist_ok=True)
+        st = os.lstat(BANK_CACHE_DIR)
+    except OSError as e:
+        print(f"⚠️ Bank report cache unavailable: {e}")
+        return False
+    if not stat.S_ISDIR(st.st_mode):
+        print(f"⚠️ Bank report cache disabled, {BANK_CACHE_DIR} is not a directory")
+        return False
+    # Without POSIX ownership (Windows) the temp dir is already per-user
+    if hasattr(os, "getuid") and (st.st_uid != os.getuid() or st.st_mode & 0o077):
+        print(f"⚠️ Bank report cache disabled, {BANK_CACHE_DIR} is not private to this user")
+        return False
+    return True
+
+def _prune_bank_cache():
+    """Deletes least recently used cache entries beyond BANK_CACHE_MAX_ENTRIES and abandoned temp files."""
+    entries = []
+    abandoned = []
+    stale_before = time.time() - BANK_CACHE_TMP_MAX_AGE_SECONDS
+    for entry in os.scandir(BANK_CACHE_DIR):
+        if not entry.name.startswith("bank_v"):
+            continue
+        try:
+            mtime = entry.stat().st_mtime
+        except FileNotFoundError:
+            continue
+        if entry.name.endswith(".pkl"):
+            entries.append((mtime, entry.path))
+        elif entry.name.endswith(".tmp") and mtime < stale_before:
+            # Left behind by a worker that died mid-write; recent ones may still be in progress
+            abandoned.append(entry.path)
+    entries.sort(reverse=True)
+    for path in abandoned + [path for _, path in entries[BANK_CACHE_MAX_ENTRIES:]]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            # Another worker pruned it first
+            pass
+
+def load_bank_report(bank_file_bytes, bank_sheet):
+    """Parses and cleans the bank report, reusing the cached result for a previously seen upload."""
+    cache_path = None
+    if _bank_cache_dir_is_private():
+        digest = hashlib.blake2b(bank_file_bytes, digest_size=16)
+        digest.update(bank_sheet.encode())
+        cache_path = os.path.join(BANK_CACHE_DIR, f"bank_v{BANK_CACHE_VERSION}_{digest.hexdigest()}.pkl")
+        if os.path.exists(cache_path):
+            try:
+                bank_df = pd.read_pickle(cache_path)
+                # Refresh the mtime so pruning treats this entry as recently used
+                os.utime(cache_path)
+                return bank_df
+            except Exception as e:
+                print(f"⚠️ Ignoring unreadable bank report cache {cache_path}: {e}")
+
+    bank_columns = ["Description", "Oracle Receipt Number (Recon)", "Receipt Amount", "Currency", "Account Number."]
+    bank_df = safe_read_excel_from_bytes(
+        bank_file_bytes, sheet_name=bank_sheet, header=8,
+        usecols=lambda c: str(c).strip() in bank_columns
+    )
+    bank_df.columns = [str(c).strip() for c in bank_df.columns]
+    bank_df["Description"] = bank_df["Description"].astype("string").str.strip().str.replace("\"", "", regex=False)
+    bank_df["Oracle Receipt Number (Recon)"] = bank_df["Oracle Receipt Number (Recon)"].astype(str).str.strip()
+    oracle_num = pd.to_numeric(bank_df["Oracle Receipt Number (Recon)"], errors="coerce")
+    # Numbers outside the int64 range (e.g. a long reference pasted into the
+    # column) are treated like any other unusable oracle number
+    usable = np.isfinite(oracle_num) & (oracle_num.abs() < 2**63)
+    bank_df["_oracle_num"] = np.trunc(oracle_num.where(usable)).astype("Int64")
+    bank_df["_receipt_amt"] = pd.to_numeric(bank_df["Receipt Amount"], errors="coerce").fillna(0.0)
+
+    # Drop receipts without a usable oracle number, which can never be matched.
+    # Within a description a repeated oracle number is only ever reached after
+    # its first listing, so only that one is kept; listings under other
+    # descriptions stay and are arbitrated by the kernel's used-oracle bitset
+    bank_df = bank_df.dropna(subset=["_oracle_num"]).drop_duplicates(["Description", "_oracle_num"], keep="first")
+    bank_df = bank_df.reset_index(drop=True)
+
+    # Write under a per-process name and rename, so concurrent workers never
+    # read a partially written cache entry
+    if cache_path is not None:
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        try:
+            bank_df.to_pickle(tmp_path)
+            os.replace(tmp_path, cache_path)
+            _prune_bank_cache()
+        except OSError as e:
+            print(f"⚠️ Could not cache bank report: {e}")
+            # Do not leave a partial write behind, e.g. when the disk is full
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    return bank_df
+
 def extract_nbo_receipt_breakdown_rows_web(nbo_file_bytes, nbo_sheet, bank_file_bytes, bank_sheet):
-    """Processes NBO and bank report Excel bytes, returns processed Excel bytes."""
+    """Processes NBO and bank report Excel bytes, returns the processed workbook as a rewound BytesIO."""
     
     # Load NBO Data
-    nbo_df = safe_read_excel_from_bytes(nbo_file_bytes, sheet_name=nbo_sheet, skiprows=16, header=None)
-    nbo_df = nbo_df[[2, 3, 5, 7, 16]]
-    nbo_df.columns = ["Date", "Bank Reference No", "Description", "Credit Amount", "ORACLE STATUS"]
+    nbo_df = safe_read_excel_from_bytes(
+        nbo_file_bytes, sheet_name=nbo_sheet, skiprows=16, header=None,
+        usecols=[2, 3, 5, 7], dtype={3: "string", 5: "string"}
+    )
+    nbo_df.columns = ["Date", "Bank Reference No", "Description", "Credit Amount"]
 
     # Filter rows
     nbo_df = nbo_df[nbo_df["Credit Amount"].notna() & nbo_df["Bank Reference No"].notna()]
 
     # Clean data
     nbo_df["Date"] = pd.to_datetime(nbo_df["Date"], errors="coerce")
-    nbo_df["Bank Reference No"] = nbo_df["Bank Reference No"].astype(str).str.strip()
-    nbo_df["Description"] = nbo_df["Description"].astype(str).str.strip().str.replace("\"", "", regex=False)
+    nbo_df["Bank Reference No"] = nbo_df["Bank Reference No"].str.strip()
+    nbo_df["Description"] = nbo_df["Description"].str.strip().str.replace("\"", "", regex=False)
 
     # Load Bank Report
-    bank_df = safe_read_excel_from_bytes(bank_file_bytes, sheet_name=bank_sheet, header=8)
-    bank_df.columns = [str(c).strip() for c in bank_df.columns]
-    bank_df["Description"] = bank_df["Description"].astype(str).str.strip().str.replace("\"", "", regex=False)
-    bank_df["Oracle Receipt Number (Recon)"] = bank_df["Oracle Receipt Number (Recon)"].astype(str).str.strip()
+    bank_df = load_bank_report(bank_file_bytes, bank_sheet)
 
     # Build lookup maps
-    bank_lookup = {
-        str(row["Oracle Receipt Number (Recon)"]).strip(): row
-        for _, row in bank_df.iterrows()
-        if pd.notna(row["Oracle Receipt Number (Recon)"])
-    }
+    oracle_arr = bank_df["_oracle_num"].to_numpy(dtype=np.int64)
+    oracle_codes, oracle_uniques = pd.factorize(oracle_arr)
+    amt_arr = bank_df["_receipt_amt"].to_numpy(dtype=np.float64)
 
-    bank_groups = defaultdict(list)
-    for idx, row in bank_df.iterrows():
-        desc = row["Description"]
-        if pd.notna(desc):
-            bank_groups[desc].append(idx)
+    # Greedy allocation: each NBO row consumes unused receipts of the same
+    # description, in bank report order, until its credit amount is covered.
+    # Rows sharing a description compete for the same receipts, so this scan
+    # is order-dependent and runs in the compiled _match_receipts kernel.
+    nbo_df = nbo_df.reset_index(drop=True)
+    desc_codes, _ = pd.factorize(pd.concat([nbo_df["Description"], bank_df["Description"]], ignore_index=True))
+    nbo_codes = desc_codes[:len(nbo_df)]
+    bank_codes = desc_codes[len(nbo_df):]
 
-    output_rows = []
-    used_oracle_numbers = set()
-    used_bank_indices = set()
+    # Bank positions grouped by description, keeping report order within each group
+    bank_order = np.argsort(bank_codes, kind="stable")
+    sorted_codes = bank_codes[bank_order]
+    group_start = np.searchsorted(sorted_codes, nbo_codes, side="left")
+    group_end = np.searchsorted(sorted_codes, nbo_codes, side="right")
 
-    for _, nbo_row in nbo_df.iterrows():
-        ref = str(nbo_row["Bank Reference No"]).strip()
-        desc = nbo_row["Description"]
-        credit_amt = float(nbo_row["Credit Amount"])
-        txn_date = nbo_row["Date"]
+    # Only rows whose description appears in the bank report go through the
+    # kernel; missing descriptions factorize to -1 and never match
+    with_candidates = np.flatnonzero((nbo_codes >= 0) & (group_end > group_start))
+    candidate_nbo_pos, match_bank_pos = _match_receipts(
+        nbo_df["Credit Amount"].to_numpy(dtype=np.float64)[with_candidates],
+        group_start[with_candidates], group_end[with_candidates], bank_order, amt_arr,
+        oracle_codes, len(oracle_uniques)
+    )
+    match_nbo_pos = with_candidates[candidate_nbo_pos]
 
-        matched_receipts = []
-        cumulative_sum = 0.0
+    # One output row per matched receipt plus one per unmatched NBO row. Matched
+    # rows are unique per oracle number; of the unmatched rows only the first
+    # one per bank reference is reported.
+    unmatched = np.ones(len(nbo_df), dtype=bool)
+    unmatched[match_nbo_pos] = False
+    repeated_ref = (nbo_df["Bank Reference No"].where(unmatched).duplicated() & unmatched).to_numpy()
+    unmatched_pos = np.flatnonzero(unmatched & ~repeated_ref)
 
-        for bank_idx in bank_groups.get(desc, []):
-            if bank_idx in used_bank_indices:
-                continue
-            bank_row = bank_df.loc[bank_idx]
-            oracle_raw = bank_row["Oracle Receipt Number (Recon)"]
+    # Every column is gathered once from these positions, in NBO row order;
+    # bank position -1 marks an unmatched row and gathers as missing
+    row_nbo = np.concatenate([match_nbo_pos, unmatched_pos])
+    row_bank = np.concatenate([match_bank_pos, np.full(len(unmatched_pos), -1, dtype=np.int64)])
+    order = np.argsort(row_nbo, kind="stable")
+    row_nbo, row_bank = row_nbo[order], row_bank[order]
+    matched = row_bank >= 0
+    is_first = np.diff(row_nbo, prepend=-1) != 0
+    is_last = np.diff(row_nbo, append=-1) != 0
 
-            try:
-                oracle_num = int(float(oracle_raw)) if pd.notna(oracle_raw) else None
-            except ValueError:
-                oracle_num = None
+    bank_details = bank_df.reindex(columns=["Currency", "Account Number."])
+    credits = nbo_df["Credit Amount"].to_numpy(dtype=np.float64)[row_nbo]
+    receipts = take(amt_arr, row_bank, allow_fill=True)
+    totals = np.bincount(row_nbo[matched], weights=receipts[matched], minlength=len(nbo_df))[row_nbo]
 
-            if oracle_num in used_oracle_numbers or oracle_num is None:
-                continue
+    # Credit Amount is shown on the first receipt of a breakdown, Tally on the last
+    credit_col = credits.astype(object)
+    credit_col[~is_first] = ""
+    tally_col = np.round(credits - totals, 2).astype(object)
+    tally_col[~is_last] = ""
+    tally_col[~matched] = None
 
-            try:
-                receipt_amt = float(bank_row["Receipt Amount"])
-            except ValueError:
-                receipt_amt = 0.0
-
-            matched_receipts.append((
-                receipt_amt, oracle_num,
-                bank_row.get("Currency"),
-                bank_row.get("Account Number.")
-            ))
-            used_oracle_numbers.add(oracle_num)
-            used_bank_indices.add(bank_idx)
-            cumulative_sum += receipt_amt
-
-            if cumulative_sum >= credit_amt - 0.01:
-                break
+    n = len(row_nbo)
+    dates = nbo_df["Date"].to_numpy()[row_nbo]
+    final_df = pd.DataFrame({
+        "Line No.": np.arange(1, n + 1),
+        "Type": _constant_column("Receipt", n),
+        "Code": _constant_column("", n),
+        "ORACLE NUMBER": take(oracle_arr, row_bank, allow_fill=True),
+        "Transaction Date": dates,
+        "Account Currency Cleared Date": dates,
+        "Currency": take(bank_details["Currency"].to_numpy(object), row_bank, allow_fill=True),
+        "Exchange Rate Date": dates,
+        "Rate Type": _constant_column("Corporate", n),
+        "Account Number": take(bank_details["Account Number."].to_numpy(object), row_bank, allow_fill=True),
+        "Customer Name": np.full(n, None, dtype=object),
+        "Account Currency Amount": np.full(n, None, dtype=object),
+        "Account Currency Amount Cleared": np.full(n, None, dtype=object),
+        "Cleared Date": dates,
+        "Value Date": dates,
+        "GL Date": dates,
+        "Bank Reference No": nbo_df["Bank Reference No"].to_numpy()[row_nbo],
+        "Description": nbo_df["Description"].to_numpy()[row_nbo],
+        "Credit Amount": credit_col,
+        "Receipt Amount": receipts,
+        "Tally": tally_col,
+    })
+    # Low-cardinality text columns are stored once per distinct value
+    for column in ["Currency", "Description"]:
+        final_df[column] = final_df[column].astype("category")
 
-        def build_output_row(overrides={}):
-            row_template = {
-                "Line No.": None,
-                "Type": "Receipt",
-                "Code": "",
-                "ORACLE NUMBER": None,
-                "Transaction Date": txn_date,
-                "Account Currency Cleared Date": txn_date,
-                "Currency": None,
-                "Exchange Rate Date": txn_date,
-                "Rate Type": "Corporate",
-                "Account Number": None,
-                "Customer Name": None,
-                "Account Currency Amount": None,
-                "Account Currency Amount Cleared": None,
-                "Cleared Date": txn_date,
-                "Value Date": txn_date,
-                "GL Date": txn_date,
-                "Bank Reference No": ref,
-                "Description": desc,
-                "Credit Amount": credit_amt,
-                "Receipt Amount": None,
-                "Tally": None
-            }
-            row_template.update(overrides)
-            return row_template
-
-        if not matched_receipts:
-            output_rows.append(build_output_row())
-        else:
-            total_receipts = sum(r[0] for r in matched_receipts)
-            for idx, (receipt_amt, oracle_num, currency, account_number) in enumerate(matched_receipts):
-                is_last = idx == len(matched_receipts) - 1
-                row_data = {
-                    "ORACLE NUMBER": oracle_num,
-                    "Currency": currency,
-                    "Account Number": account_number,
-                    "Credit Amount": credit_amt if idx == 0 else "",
-                    "Receipt Amount": receipt_amt,
-                    "Tally": round(credit_amt - total_receipts, 2) if is_last else ""
-                }
-                output_rows.append(build_output_row(row_data))
-
-    final_df = pd.DataFrame(output_rows)
-    final_df.drop_duplicates(subset=["Bank Reference No", "ORACLE NUMBER"], keep="first", inplace=True)
-
-    if "Line No." in final_df.columns:
-        final_df.drop(columns=["Line No."], inplace=True)
-    final_df.insert(0, "Line No.", range(1, len(final_df) + 1))
-
-    desired_order = [
-        "Line No.", "Type", "Code", "ORACLE NUMBER",
+    date_columns = [
         "Transaction Date", "Account Currency Cleared Date",
-        "Currency", "Exchange Rate Date", "Rate Type",
-        "Account Number", "Customer Name",
-        "Account Currency Amount", "Account Currency Amount Cleared",
-        "Cleared Date", "Value Date", "GL Date",
-        "Bank Reference No", "Description",
-        "Credit Amount", "Receipt Amount", "Tally"
+        "Exchange Rate Date", "Cleared Date", "Value Date", "GL Date"
     ]
-    final_df = final_df[[col for col in desired_order if col in final_df.columns]]
+    # Dates render as dd-mmm-yy, so only their header can be wider than 9 characters
+    widths = {
+        column: max(9 if column in date_columns else _max_text_length(final_df[column]), len(column)) + 2
+        for column in final_df.columns
+    }
 
+    # constant_memory flushes each row as soon as the next one starts, so cells
+    # must be written row by row; DataFrame.to_excel writes column by column
     output_buffer = io.BytesIO()
-    with pd.ExcelWriter(output_buffer, engine="xlsxwriter", datetime_format="dd-mmm-yy") as writer:
-        final_df.to_excel(writer, index=False, sheet_name="Formatted")
+    with pd.ExcelWriter(
+        output_buffer, engine="xlsxwriter", engine_kwargs={"options": {"constant_memory": True}}
+    ) as writer:
         workbook = writer.book
-        worksheet = writer.sheets["Formatted"]
+        worksheet = workbook.add_worksheet("Formatted")
         date_fmt = workbook.add_format({"num_format": "dd-mmm-yy"})
+        header_fmt = workbook.add_format({"bold": True, "border": 1, "align": "center", "valign": "top"})
+        column_fmts = [date_fmt if column in date_columns else None for column in final_df.columns]
+
         for i, column in enumerate(final_df.columns):
-            series = final_df[column].astype(str)
-            max_len = max(series.map(len).max(), len(column)) + 2
-            fmt = date_fmt if column in [
-                "Transaction Date", "Account Currency Cleared Date",
-                "Exchange Rate Date", "Cleared Date", "Value Date", "GL Date"
-            ] else None
-            worksheet.set_column(i, i, max_len, fmt)
+            worksheet.set_column(i, i, widths[column], column_fmts[i])
+        worksheet.write_row(0, 0, final_df.columns, header_fmt)
+
+        cells = final_df.astype(object).where(final_df.notna(), None)
+        for row_idx, row in enumerate(cells.itertuples(index=False, name=None), start=1):
+            for col_idx, value in enumerate(row):
+                worksheet.write(row_idx, col_idx, value, column_fmts[col_idx])
 
     output_buffer.seek(0)
-    return output_buffer.getvalue()
+    return output_buffer
 
 @app.route("/process_excel", methods=["POST"])
 def process_excel():
@@ -184,20 +362,33 @@ def process_excel():
     nbo_sheet = request.form.get("nbo_sheet", "Jul-25")
     bank_sheet = request.form.get("bank_sheet", "All Receipts Report")
 
+    executor = get_executor()
     try:
         nbo_file_bytes = nbo_file.read()
         bank_file_bytes = bank_file.read()
-        processed_excel_bytes = extract_nbo_receipt_breakdown_rows_web(
+        future = executor.submit(
+            extract_nbo_receipt_breakdown_rows_web,
             nbo_file_bytes, nbo_sheet, bank_file_bytes, bank_sheet
         )
+        processed_buffer = future.result(timeout=PROCESSING_TIMEOUT_SECONDS)
         return send_file(
-            io.BytesIO(processed_excel_bytes),
+            processed_buffer,
             mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
             as_attachment=True,
             download_name="NBO_Matched_Exploded_Processed.xlsx"
         )
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
+    except FutureTimeoutError:
+        # Drop the job if it is still queued, so an overloaded pool does not work
+        # for clients that already gave up; a job already handed to a worker
+        # process cannot be stopped and keeps the pool busy until it finishes
+        future.cancel()
+        return jsonify({"error": f"Processing took longer than {PROCESSING_TIMEOUT_SECONDS} seconds"}), 504
+    except BrokenProcessPool:
+        # A worker died (e.g. killed for memory); the pool is unusable from now on
+        discard_executor(executor)
+        return jsonify({"error": "The processing worker crashed, please try again"}), 500
     except Exception as e:
         return jsonify({"error": f"An internal server error occurred: {e}"}), 500
 
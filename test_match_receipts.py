@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from NBO import _match_receipts
+
+
+def reference_scan(nbo_descs, nbo_credits, bank_descs, bank_oracles, bank_amts):
+    """Plain set-based greedy scan, as the matching loop worked before the kernel."""
+    matches = []
+    used_bank_indices = set()
+    used_oracle_numbers = set()
+    for nbo_pos, (desc, credit_amt) in enumerate(zip(nbo_descs, nbo_credits)):
+        cumulative_sum = 0.0
+        for bank_idx in range(len(bank_descs)):
+            if bank_descs[bank_idx] != desc or bank_idx in used_bank_indices:
+                continue
+            if bank_oracles[bank_idx] in used_oracle_numbers:
+                continue
+            matches.append((nbo_pos, bank_idx))
+            used_bank_indices.add(bank_idx)
+            used_oracle_numbers.add(bank_oracles[bank_idx])
+            cumulative_sum += bank_amts[bank_idx]
+
+            if cumulative_sum >= credit_amt - 0.01:
+                break
+    return matches
+
+
+def kernel_scan(nbo_descs, nbo_credits, bank_descs, bank_oracles, bank_amts):
+    """Runs _match_receipts on the grouped arrays built the same way as in NBO.py."""
+    bank_order = np.argsort(bank_descs, kind="stable")
+    sorted_codes = bank_descs[bank_order]
+    group_start = np.searchsorted(sorted_codes, nbo_descs, side="left")
+    group_end = np.searchsorted(sorted_codes, nbo_descs, side="right")
+    oracle_codes, oracle_uniques = pd.factorize(bank_oracles)
+    nbo_pos, bank_pos = _match_receipts(
+        nbo_credits, group_start, group_end, bank_order, bank_amts,
+        oracle_codes, len(oracle_uniques)
+    )
+    return list(zip(nbo_pos.tolist(), bank_pos.tolist()))
+
+
+@pytest.mark.parametrize("seed", range(300))
+def test_match_receipts_matches_reference_scan(seed):
+    rng = np.random.default_rng(seed)
+    n_descs = int(rng.integers(1, 5))
+    n_bank = int(rng.integers(0, 40))
+    n_nbo = int(rng.integers(0, 30))
+
+    # Few descriptions and oracle numbers, so NBO rows share descriptions and
+    # oracle numbers repeat both within and across descriptions; one NBO
+    # description has no receipts at all
+    bank_descs = rng.integers(0, n_descs, n_bank)
+    bank_oracles = rng.integers(0, max(n_bank // 2, 1), n_bank)
+    bank_amts = rng.choice([-50.0, -0.5, 0.0, 0.0, 10.0, 25.5, 100.0, 333.33], n_bank)
+    nbo_descs = rng.integers(0, n_descs + 1, n_nbo)
+    nbo_credits = rng.choice([-20.0, 0.0, 0.01, 10.0, 50.0, 135.5, 1000.0], n_nbo)
+
+    expected = reference_scan(nbo_descs, nbo_credits, bank_descs, bank_oracles, bank_amts)
+    assert kernel_scan(nbo_descs, nbo_credits, bank_descs, bank_oracles, bank_amts) == expected